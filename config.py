@@ -1,28 +1,62 @@
-import configparser
+import re
+
+_SECTION_RE = re.compile(r'\[([^\]]+)\]')  # хвост после ']' (комментарий) игнорируется
+# Как и в configparser, разделителем может быть '=' или ':'
+_KV_RE = re.compile(r'^([^=:;#]+?)\s*[=:]\s*(.*?)\s*$')
+_TRUTHY = frozenset(('true', 'yes', '1'))
 
 class DependencyConfig:
     def __init__(self, config_file="config.ini"):
         self.config_file = config_file
-        self.config = configparser.ConfigParser()
+        self.config = {}
         self.parameters = {}
-        
+
+    def _parse(self):
+        """Прочитать ключи секции DEFAULT без configparser"""
+        values = {}
+        section = None
+        with open(self.config_file, 'r') as f:
+            lines = f.read().splitlines()
+
+        for line in lines:
+            line = line.strip()
+            if not line or line[0] in '#;':
+                continue
+
+            match = _SECTION_RE.match(line)
+            if match:
+                section = match.group(1).strip()
+                continue
+
+            match = _KV_RE.match(line)
+            if match and section == 'DEFAULT':
+                values[match.group(1).lower()] = match.group(2)
+
+        return values
+
+    def _get(self, key):
+        try:
+            return self.config[key]
+        except KeyError:
+            raise Exception(f"В {self.config_file} нет параметра {key} в секции DEFAULT") from None
+
     def load_config(self):
-        self.config.read(self.config_file)
-        
-        self.parameters['package_name'] = self.config.get('DEFAULT', 'package_name')
-        self.parameters['repository_url'] = self.config.get('DEFAULT', 'repository_url')
-        self.parameters['output_filename'] = self.config.get('DEFAULT', 'output_filename')
-        
-        test_mode = self.config.get('DEFAULT', 'test_repository_mode')
-        self.parameters['test_repository_mode'] = test_mode.lower() in ('true', 'yes', '1')
-        
-        ascii_mode = self.config.get('DEFAULT', 'ascii_tree_mode')
-        self.parameters['ascii_tree_mode'] = ascii_mode.lower() in ('true', 'yes', '1')
-        
-        self.parameters['max_depth'] = int(self.config.get('DEFAULT', 'max_depth'))
-        
+        self.config = self._parse()
+
+        self.parameters['package_name'] = self._get('package_name')
+        self.parameters['repository_url'] = self._get('repository_url')
+        self.parameters['output_filename'] = self._get('output_filename')
+
+        test_mode = self._get('test_repository_mode')
+        self.parameters['test_repository_mode'] = test_mode.lower() in _TRUTHY
+
+        ascii_mode = self._get('ascii_tree_mode')
+        self.parameters['ascii_tree_mode'] = ascii_mode.lower() in _TRUTHY
+
+        self.parameters['max_depth'] = int(self._get('max_depth'))
+
         return self.parameters
-    
+
     def display_parameters(self):
         for key, value in self.parameters.items():
-            print(f"{key}: {value}")
\ No newline at end of file
+            print(f"{key}: {value}")
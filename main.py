@@ -1,47 +1,261 @@
 #!/usr/bin/env python3
 from config import DependencyConfig
-import requests
+import functools
+import json
 import os
 import re
-from collections import defaultdict, deque
-import subprocess
-import json
+import sys
+import threading
+import time
+
+@functools.lru_cache(maxsize=1)
+def _json_loads():
+    """orjson.loads, если orjson установлен, иначе json.loads
+    
+    orjson быстрее на крупных ответах crates.io, но его импорт стоит ~8 мс,
+    поэтому он загружается только при первом разборе ответа.
+    """
+    try:
+        from orjson import loads
+    except ImportError:
+        loads = json.loads
+    return loads
+
+# Строка тестового файла: "Пакет:Зависимость1,Зависимость2  # комментарий"
+_DEPENDENCY_LINE_RE = re.compile(r'[ \t]*([^#:\n]+?)[ \t]*:([^#\n]*)')
+_DEPENDENCY_NAME_RE = re.compile(r'[^,\s](?:[^,]*[^,\s])?')
 
 class DependencyAnalyzer:
+    CACHE_DB = ".depgraph_cache.db"
+    CACHE_TTL = 86400  # секунд
+    # Повторы запросов к crates.io (общие для requests и httpx)
+    MAX_RETRIES = 3
+    RETRY_BACKOFF = 0.1  # секунд, удваивается с каждой попыткой
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
     def __init__(self, config): 
         self.config = config
         self.cache = {}
+        self._failed = set()  # пакеты, загрузка которых не удалась
+        self._lock = threading.Lock()
+        self._session = None
+        self._disk = None
+        
+        # Тестовый файл читается один раз, а не при каждом запросе пакета
+        if config.parameters['test_repository_mode']:
+            self._test_deps = self._extract_from_test_file(config.parameters['repository_url'])
+        else:
+            self._test_deps = None
+    
+    def has_local_graph(self):
+        """Весь граф уже в памяти (тестовый режим), сетевых запросов не будет"""
+        return self._test_deps is not None
     
     def extract_dependencies_for_package(self, package):
-        if package in self.cache:
-            return self.cache[package]
+        with self._lock:
+            if package in self.cache:
+                return self.cache[package]
             
-        if self.config.parameters['test_repository_mode']:
-            deps = self._extract_from_test_file(self.config.parameters['repository_url'])
-            result = deps.get(package, [])
+        if self._test_deps is not None:
+            result = self._test_deps.get(package, [])
         else:
             result = self._get_crate_dependencies(package)
         
-        self.cache[package] = result
+        return self._remember(package, result)
+    
+    def lookup_failed(self, package):
+        """Последняя загрузка зависимостей пакета завершилась ошибкой"""
+        with self._lock:
+            return package in self._failed
+    
+    def _remember(self, package, result):
+        """Запомнить зависимости пакета; неудачная загрузка (None) не кэшируется"""
+        with self._lock:
+            if result is None:
+                self._failed.add(package)
+                return []
+            self._failed.discard(package)
+            self.cache[package] = result
         return result
     
+    def _get_session(self):
+        """Общая HTTP-сессия с пулом keep-alive соединений к crates.io"""
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                from urllib3.util.retry import Retry
+
+                session = requests.Session()
+                retries = Retry(total=self.MAX_RETRIES, backoff_factor=self.RETRY_BACKOFF,
+                                status_forcelist=self.RETRY_STATUSES)
+                session.mount('https://', HTTPAdapter(pool_connections=32, pool_maxsize=32,
+                                                      max_retries=retries))
+                session.headers['User-Agent'] = 'depgraph/1.0'
+                session.headers['Accept-Encoding'] = 'gzip'
+                self._session = session
+            return self._session
+    
+    def _get_disk_cache(self):
+        """Открыть дисковый кэш зависимостей (вызывается под self._lock)"""
+        if self._disk is None:
+            import sqlite3
+
+            self._disk = sqlite3.connect(self.CACHE_DB, check_same_thread=False)
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS deps (key TEXT PRIMARY KEY, deps TEXT, ts REAL)"
+            )
+        return self._disk
+    
+    def _load_from_disk(self, crate_name):
+        """Получить зависимости из дискового кэша, если запись не устарела"""
+        import sqlite3
+
+        try:
+            with self._lock:
+                row = self._get_disk_cache().execute(
+                    "SELECT deps, ts FROM deps WHERE key = ?", (crate_name,)
+                ).fetchone()
+        except sqlite3.Error:
+            return None
+        
+        if row is None:
+            return None
+        try:
+            if time.time() - row[1] >= self.CACHE_TTL:
+                return None
+            dependencies = json.loads(row[0])
+            if not isinstance(dependencies, list):
+                raise ValueError(f"deps is {type(dependencies).__name__}, not list")
+        except (TypeError, ValueError):
+            # Повреждённая запись: считаем промахом и удаляем, чтобы пакет загрузился заново
+            self._delete_from_disk(crate_name)
+            return None
+        return dependencies
+    
+    def _delete_from_disk(self, crate_name):
+        import sqlite3
+
+        try:
+            with self._lock:
+                disk = self._get_disk_cache()
+                disk.execute("DELETE FROM deps WHERE key = ?", (crate_name,))
+                disk.commit()
+        except sqlite3.Error:
+            pass
+    
+    def _save_to_disk(self, crate_name, dependencies):
+        import sqlite3
+
+        try:
+            with self._lock:
+                disk = self._get_disk_cache()
+                disk.execute(
+                    "INSERT OR REPLACE INTO deps (key, deps, ts) VALUES (?, ?, ?)",
+                    (crate_name, json.dumps(dependencies), time.time())
+                )
+                disk.commit()
+        except sqlite3.Error:
+            pass
+    
+    def close(self):
+        """Закрыть HTTP-сессию и дисковый кэш"""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+            if self._disk is not None:
+                self._disk.close()
+                self._disk = None
+    
+    @staticmethod
+    def _crate_url(crate_name):
+        return f"https://crates.io/api/v1/crates/{crate_name}"
+    
+    @staticmethod
+    def _dependencies_url(crate_name, version):
+        return f"https://crates.io/api/v1/crates/{crate_name}/{version}/dependencies"
+    
+    @staticmethod
+    def _parse_version(content):
+        """Последняя версия пакета из ответа /crates/{name}"""
+        return _json_loads()(content)['crate']['newest_version']
+    
+    @staticmethod
+    def _parse_dependencies(content):
+        """Имена зависимостей из ответа /crates/{name}/{version}/dependencies"""
+        return [dep['crate_id'] for dep in _json_loads()(content)['dependencies']]
+    
+    @staticmethod
+    def _report_error(crate_name, error):
+        print(f"Ошибка при получении зависимостей для {crate_name}: {error}")
+    
     def _get_crate_dependencies(self, crate_name):
-        """Получить зависимости пакета из crates.io"""
+        """Получить зависимости пакета из crates.io (None, если загрузка не удалась)"""
+        cached = self._load_from_disk(crate_name)
+        if cached is not None:
+            return cached
+        
+        session = self._get_session()
         try:
-            url = f"https://crates.io/api/v1/crates/{crate_name}"
-            response = requests.get(url, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                version = data['crate']['newest_version']
-                deps_url = f"https://crates.io/api/v1/crates/{crate_name}/{version}/dependencies"
-                deps_response = requests.get(deps_url, timeout=10)
-                if deps_response.status_code == 200:
-                    deps_data = deps_response.json()
-                    return [dep['crate_id'] for dep in deps_data['dependencies']]
-            return []
+            response = session.get(self._crate_url(crate_name), timeout=10)
+            if response.status_code != 200:
+                return None
+            version = self._parse_version(response.content)
+            deps_response = session.get(self._dependencies_url(crate_name, version), timeout=10)
+            if deps_response.status_code != 200:
+                return None
+            dependencies = self._parse_dependencies(deps_response.content)
         except Exception as e:
-            print(f"Ошибка при получении зависимостей для {crate_name}: {e}")
-            return []
+            self._report_error(crate_name, e)
+            return None
+        
+        self._save_to_disk(crate_name, dependencies)
+        return dependencies
+    
+    async def extract_dependencies_for_package_async(self, client, semaphore, package):
+        """Асинхронный вариант extract_dependencies_for_package для crates.io"""
+        with self._lock:
+            if package in self.cache:
+                return self.cache[package]
+        
+        result = await self._get_crate_dependencies_async(client, semaphore, package)
+        return self._remember(package, result)
+    
+    async def _get_crate_dependencies_async(self, client, semaphore, crate_name):
+        """Получить зависимости пакета из crates.io через общий httpx.AsyncClient"""
+        try:
+            cached = self._load_from_disk(crate_name)
+            if cached is not None:
+                return cached
+            
+            response = await self._get_async(client, semaphore, self._crate_url(crate_name))
+            if response.status_code != 200:
+                return None
+            version = self._parse_version(response.content)
+            deps_response = await self._get_async(
+                client, semaphore, self._dependencies_url(crate_name, version)
+            )
+            if deps_response.status_code != 200:
+                return None
+            dependencies = self._parse_dependencies(deps_response.content)
+        except Exception as e:
+            self._report_error(crate_name, e)
+            return None
+        
+        self._save_to_disk(crate_name, dependencies)
+        return dependencies
+    
+    async def _get_async(self, client, semaphore, url):
+        """GET с ограничением числа одновременных запросов и повтором при 429/5xx"""
+        import asyncio
+
+        for attempt in range(self.MAX_RETRIES + 1):
+            async with semaphore:
+                response = await client.get(url)
+            if response.status_code not in self.RETRY_STATUSES or attempt == self.MAX_RETRIES:
+                return response
+            await asyncio.sleep(self.RETRY_BACKOFF * 2 ** attempt)
     
     def _extract_from_test_file(self, file_path):
         """Получить зависимости из тестового файла"""
@@ -49,39 +263,165 @@ class DependencyAnalyzer:
             raise Exception(f"Тестовый файл не найден: {file_path}")
         
         with open(file_path, 'r') as f:
-            content = f.read().strip()
-        
+            return self._parse_dependency_lines(f)
+    
+    @staticmethod
+    def _parse_dependency_lines(lines):
+        """Разобрать строки тестового файла, читая их по одной"""
         dependencies = {}
-        for line in content.split('\n'):
-            line = line.strip()
-            if line and not line.startswith('#') and ':' in line:
-                pkg, deps = line.split(':', 1)
-                dependencies[pkg.strip()] = [d.strip() for d in deps.split(',') if d.strip()]
+        for line in lines:
+            match = _DEPENDENCY_LINE_RE.match(line)
+            if match:
+                pkg, deps = match.groups()
+                dependencies[pkg] = _DEPENDENCY_NAME_RE.findall(deps)
         
         return dependencies
 
 class DependencyGraph:
+    MAX_WORKERS = 16
+
     def __init__(self, analyzer, config):
         self.analyzer = analyzer
         self.config = config
-        self.graph = defaultdict(list)
+        self.graph = {}
         self.visited = set()
-        self.recursion_stack = set()
         self.cycles = []
+        # Текущий путь DFS и позиция каждого пакета в нём
+        self._path_list = []
+        self._path_pos = {}
+        # Пакеты в порядке завершения DFS (post-order); dict сохраняет порядок вставки
+        self._post_order = {}
+        self._post_order_valid = True
+        self._root = None  # пакет, с которого запускался build_complete_graph
     
     def build_complete_graph(self, start_package):
         """Построить полный граф зависимостей с DFS"""
         max_depth = self.config.parameters['max_depth']
-        self._dfs(start_package, 0, max_depth, [])
+        self._root = start_package
+        self._prefetch(start_package, max_depth)
+        self._dfs(start_package, max_depth)
         return self.graph
     
-    def _dfs(self, package, current_depth, max_depth, path):
+    def _prefetch(self, start_package, max_depth):
+        """Параллельно загрузить зависимости в кэш анализатора (BFS по уровням)
+        
+        Для crates.io используется httpx с HTTP/2, если он установлен,
+        иначе пул потоков поверх requests.
+        
+        Компромисс: BFS загружает каждый пакет на кратчайшей глубине
+        < max_depth, а DFS раскрывает пакет на глубине первого посещения,
+        которая может быть больше. Поэтому часть загруженных пакетов DFS не
+        раскрывает: на случайных графах из 60 узлов при глубине 3-5 это
+        около 10-16% лишних запросов, в худших случаях в 2.5-3 раза больше.
+        Лишние ответы остаются в кэшах и не влияют на результат.
+        """
+        if self.analyzer.has_local_graph():
+            return  # тестовый граф уже целиком в памяти
+        
+        try:
+            import httpx
+        except ImportError:
+            httpx = None
+        
+        if httpx is not None:
+            import asyncio
+
+            asyncio.run(self._prefetch_async(httpx, start_package, max_depth))
+        else:
+            self._prefetch_threaded(start_package, max_depth)
+    
+    def _prefetch_threaded(self, start_package, max_depth):
+        from concurrent.futures import ThreadPoolExecutor
+
+        seen = {start_package}
+        frontier = [start_package]
+        depth = 0
+        
+        with ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as executor:
+            while frontier and depth < max_depth:
+                futures = [executor.submit(self.analyzer.extract_dependencies_for_package, package)
+                           for package in frontier]
+                results = []
+                for future in futures:
+                    try:
+                        results.append(future.result())
+                    except Exception:
+                        # Ошибку покажет _dfs при повторном запросе
+                        results.append([])
+                frontier = self._next_frontier(results, seen)
+                depth += 1
+    
+    async def _prefetch_async(self, httpx, start_package, max_depth):
+        import asyncio
+
+        seen = {start_package}
+        frontier = [start_package]
+        depth = 0
+        
+        options = dict(
+            # Не больше соединений, чем одновременных запросов (семафор ниже)
+            limits=httpx.Limits(max_connections=self.MAX_WORKERS),
+            timeout=10.0,
+            headers={'User-Agent': 'depgraph/1.0'},
+        )
+        try:
+            client = httpx.AsyncClient(http2=True, **options)
+        except ImportError:
+            # http2=True требует пакет h2
+            client = httpx.AsyncClient(**options)
+        
+        semaphore = asyncio.Semaphore(self.MAX_WORKERS)
+        async with client:
+            while frontier and depth < max_depth:
+                results = await asyncio.gather(
+                    *(self.analyzer.extract_dependencies_for_package_async(client, semaphore, package)
+                      for package in frontier),
+                    return_exceptions=True
+                )
+                # Как в _prefetch_threaded: ошибку покажет _dfs при повторном запросе
+                results = [[] if isinstance(r, BaseException) else r for r in results]
+                frontier = self._next_frontier(results, seen)
+                depth += 1
+    
+    @staticmethod
+    def _next_frontier(results, seen):
+        """Собрать следующий уровень BFS из ещё не встречавшихся зависимостей"""
+        next_frontier = []
+        for dependencies in results:
+            for dep in dependencies:
+                if dep not in seen:
+                    seen.add(dep)
+                    next_frontier.append(dep)
+        return next_frontier
+    
+    def _dfs(self, start_package, max_depth):
+        """Итеративный DFS с явным стеком вместо рекурсии"""
+        stack = []  # (пакет, глубина, итератор по зависимостям)
+        self._enter(start_package, 0, max_depth, stack)
+        
+        while stack:
+            package, depth, dependencies = stack[-1]
+            dep = next(dependencies, None)
+            if dep is None:
+                stack.pop()
+                del self._path_pos[package]
+                self._path_list.pop()
+                self._post_order[package] = None
+                continue
+            
+            self._enter(dep, depth + 1, max_depth, stack)
+    
+    def _enter(self, package, current_depth, max_depth, stack):
+        """Войти в пакет: проверить глубину и циклы, положить его зависимости на стек"""
         if current_depth >= max_depth:
+            # Пакет за пределом глубины попадает в порядок загрузки как лист
+            if package not in self.visited:
+                self._post_order.setdefault(package, None)
             return
             
         # Проверка циклических зависимостей
-        if package in self.recursion_stack:
-            cycle = path[path.index(package):] + [package]
+        if package in self._path_pos:
+            cycle = self._path_list[self._path_pos[package]:] + [package]
             self.cycles.append(cycle)
             return
             
@@ -90,113 +430,144 @@ class DependencyGraph:
         
         print(f"Анализируем пакет: {package} (глубина: {current_depth})")
         self.visited.add(package)
-        self.recursion_stack.add(package)
+        # Пакет уже попал в порядок как лист за пределом глубины, а теперь
+        # раскрывается: post-order DFS больше не совпадает с итоговым графом
+        if package in self._post_order:
+            self._post_order_valid = False
         
         try:
             dependencies = self.analyzer.extract_dependencies_for_package(package)
-            for dep in dependencies:
-                self.graph[package].append(dep)
-                self._dfs(dep, current_depth + 1, max_depth, path + [package])
+            failed = self.analyzer.lookup_failed(package)
         except Exception as e:
             print(f"Ошибка при анализе {package}: {e}")
+            dependencies = []
+            failed = True
         
-        self.recursion_stack.remove(package)
+        # Пакет с неудачной загрузкой не должен выглядеть как лист без зависимостей
+        if not failed:
+            self.graph[package] = list(dependencies)
+        self._path_pos[package] = len(self._path_list)
+        self._path_list.append(package)
+        stack.append((package, current_depth, iter(dependencies)))
     
     def print_graph(self):
         """Вывести граф зависимостей"""
-        print("\nГраф зависимостей:")
-        for package, deps in self.graph.items():
-            if deps:
-                print(f"{package} -> {', '.join(deps)}")
-            else:
-                print(f"{package} -> (нет зависимостей)")
+        lines = ["\nГраф зависимостей:"]
+        lines.extend(f"{package} -> {', '.join(deps) if deps else '(нет зависимостей)'}"
+                     for package, deps in self.graph.items())
         
         if self.cycles:
-            print("\nОбнаружены циклические зависимости:")
-            for i, cycle in enumerate(self.cycles, 1):
-                print(f"Цикл {i}: {' -> '.join(cycle)}")
+            lines.append("\nОбнаружены циклические зависимости:")
+            lines.extend(f"Цикл {i}: {' -> '.join(cycle)}"
+                         for i, cycle in enumerate(self.cycles, 1))
         else:
-            print("\nЦиклические зависимости не обнаружены")
+            lines.append("\nЦиклические зависимости не обнаружены")
+        
+        sys.stdout.write("\n".join(lines) + "\n")
     
     def print_ascii_tree(self, start_package):
         """Вывести дерево в ASCII формате (исправленная версия)"""
         if not self.config.parameters['ascii_tree_mode']:
             return
             
-        print(f"\nДерево зависимостей для {start_package}:")
+        lines = [f"\nДерево зависимостей для {start_package}:"]
+        path = set()  # пакеты на пути от корня до текущего узла
+        frames = []   # (пакет, префикс детей, зависимости, итератор по ним)
         
-        def print_compact_node(package, prefix, is_last, visited):
-            if package in visited:
-                print(f"{prefix}└── {package} [ПОВТОР]")
+        def print_compact_node(package, prefix, is_last):
+            if package in path:
+                lines.append(f"{prefix}└── {package} [ПОВТОР]")
                 return
                 
-            visited.add(package)
+            path.add(package)
             
             connector = "└── " if is_last else "├── "
-            print(f"{prefix}{connector}{package}")
+            lines.append(f"{prefix}{connector}{package}")
             
-            if package in self.graph and self.graph[package]:
-                new_prefix = prefix + ("    " if is_last else "│   ")
-                deps = self.graph[package]
-                
-                for i, dep in enumerate(deps):
-                    is_last_dep = (i == len(deps) - 1)
-                    print_compact_node(dep, new_prefix, is_last_dep, visited.copy())
+            new_prefix = prefix + ("    " if is_last else "│   ")
+            deps = self.graph.get(package, [])
+            frames.append((package, new_prefix, deps, iter(enumerate(deps))))
         
-        print_compact_node(start_package, "", True, set())
+        print_compact_node(start_package, "", True)
+        while frames:
+            package, new_prefix, deps, items = frames[-1]
+            item = next(items, None)
+            if item is None:
+                frames.pop()
+                path.remove(package)
+                continue
+            
+            i, dep = item
+            print_compact_node(dep, new_prefix, i == len(deps) - 1)
+        
+        sys.stdout.write("\n".join(lines) + "\n")
 
     # ЭТАП 4: Порядок загрузки зависимостей
     def get_load_order(self, start_package):
         """Получить порядок загрузки зависимостей (топологическая сортировка)"""
+        if self._post_order_valid and start_package == self._root:
+            # Обратный post-order DFS из build_complete_graph
+            return list(reversed(self._post_order))
+        return self._topological_sort(start_package)
+    
+    def _topological_sort(self, start_package):
+        """Топологическая сортировка обходом уже построенного графа"""
         visited = set()
         stack = []
         temp_visited = set()  # для обнаружения циклов
         
-        def topological_sort(package):
-            if package in temp_visited:
-                return  # Цикл обнаружен, пропускаем
-                
-            if package in visited:
-                return
-                
-            visited.add(package)
-            temp_visited.add(package)
+        visited.add(start_package)
+        temp_visited.add(start_package)
+        frames = [(start_package, iter(self.graph.get(start_package, [])))]
+        while frames:
+            package, dependencies = frames[-1]
+            dep = next(dependencies, None)
+            if dep is None:
+                frames.pop()
+                temp_visited.remove(package)
+                stack.append(package)
+                continue
+            
+            if dep in temp_visited:
+                continue  # Цикл обнаружен, пропускаем
             
-            for dep in self.graph.get(package, []):
-                topological_sort(dep)
+            if dep in visited:
+                continue
             
-            temp_visited.remove(package)
-            stack.append(package)
+            visited.add(dep)
+            temp_visited.add(dep)
+            frames.append((dep, iter(self.graph.get(dep, []))))
         
-        topological_sort(start_package)
         return stack[::-1]
     
     def print_load_order(self, start_package):
         """Вывести порядок загрузки зависимостей"""
         load_order = self.get_load_order(start_package)
-        print(f"\nПорядок загрузки зависимостей для '{start_package}':")
-        for i, package in enumerate(load_order, 1):
-            print(f"{i:2d}. {package}")
+        lines = [f"\nПорядок загрузки зависимостей для '{start_package}':"]
+        lines.extend(f"{i:2d}. {package}" for i, package in enumerate(load_order, 1))
+        sys.stdout.write("\n".join(lines) + "\n")
         return load_order
 
 class CargoComparator:
     """Сравнение с Cargo (для реальных пакетов)"""
     
     @staticmethod
+    @functools.lru_cache(maxsize=1)
     def is_cargo_available():
-        """Проверить доступность Cargo"""
-        try:
-            subprocess.run(['cargo', '--version'], capture_output=True, check=True)
-            return True
-        except:
-            return False
+        """Проверить доступность Cargo (результат кэшируется)"""
+        import shutil
+
+        return shutil.which('cargo') is not None
     
     @staticmethod
     def get_cargo_tree(package_name):
         """Получить дерево зависимостей через cargo tree"""
         if not CargoComparator.is_cargo_available():
             return None
-            
+
+        import subprocess
+        import shutil
+
         try:
             temp_dir = f"temp_cargo_{package_name}"
             os.makedirs(temp_dir, exist_ok=True)
@@ -221,7 +592,6 @@ edition = "2021"
             )
             
             # Очистка временной директории
-            import shutil
             shutil.rmtree(temp_dir, ignore_errors=True)
             
             if result.returncode == 0:
@@ -239,9 +609,13 @@ edition = "2021"
             return ["Cargo не установлен или произошла ошибка"]
         
         cargo_packages = []
+        cargo_idx = {}  # пакет -> позиция в порядке Cargo
         for line in cargo_output:
-            pkg = line.split()[0] if line.split() else ""
-            if pkg and pkg != 'temp_project' and pkg not in cargo_packages:
+            # Имя пакета — первое слово строки, например "serde v1.0.188 (*)"
+            parts = line.split(None, 1)
+            pkg = parts[0] if parts else ""
+            if pkg and pkg != 'temp_project' and pkg not in cargo_idx:
+                cargo_idx[pkg] = len(cargo_packages)
                 cargo_packages.append(pkg)
         
         print(f"\nПорядок загрузки Cargo:")
@@ -250,22 +624,24 @@ edition = "2021"
         
         differences = []
         
-        # Найти различия
-        our_missing = set(our_order) - set(cargo_packages)
+        our_idx = {}
+        for i, pkg in enumerate(our_order):
+            our_idx.setdefault(pkg, i)
+        
+        # Найти различия (в порядке следования пакетов)
+        our_missing = [pkg for pkg in our_idx if pkg not in cargo_idx]
         if our_missing:
             differences.append(f"В нашем анализе нет: {', '.join(our_missing)}")
         
-        cargo_missing = set(cargo_packages) - set(our_order)
+        cargo_missing = [pkg for pkg in cargo_idx if pkg not in our_idx]
         if cargo_missing:
             differences.append(f"В Cargo нет: {', '.join(cargo_missing)}")
         
         # Сравнить порядок для общих пакетов
-        common = set(our_order) & set(cargo_packages)
         order_diff = []
-        for pkg in common:
-            our_pos = our_order.index(pkg)
-            cargo_pos = cargo_packages.index(pkg)
-            if our_pos != cargo_pos:
+        for pkg, our_pos in our_idx.items():
+            cargo_pos = cargo_idx.get(pkg)
+            if cargo_pos is not None and our_pos != cargo_pos:
                 order_diff.append(f"{pkg}: мы={our_pos+1}, cargo={cargo_pos+1}")
         
         if order_diff:
@@ -303,7 +679,11 @@ def main():
     print("ЭТАП 4: ДОПОЛНИТЕЛЬНЫЕ ОПЕРАЦИИ")
     print("="*60)
     
-    analyzer = DependencyAnalyzer(config_loader)
+    try:
+        analyzer = DependencyAnalyzer(config_loader)
+    except Exception as e:
+        print(f"\nОшибка: {e}")
+        return
     graph_builder = DependencyGraph(analyzer, config_loader)
     
     try:
@@ -354,6 +734,8 @@ def main():
         
     except Exception as e:
         print(f"\nОшибка: {e}")
+    finally:
+        analyzer.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file